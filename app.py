@@ -1,97 +1,216 @@
+import hashlib
+import os
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from charts import WEBGL_BAR_THRESHOLD, svg_timeline, utilization_heatmap, webgl_timeline
+from indexes import build_filter_index, build_interval_index, filter_rows
+from matrix import build_effort_matrix, skill_totals, week_columns
+from pipeline import (
+    EPOCH_MONDAY, bucket_effort, choose_bucket, coalesce_weeks, normalize_assignments, patch_effort,
+    update_intervals, weekly_effort
+)
+from readers import UPLOAD_TYPES, excel_sheets, is_excel, read_uploads
+from store import last_saved_hash, load_intervals, save_intervals
+
+# Transformation backend, "pandas" (default), "polars", or "duckdb" to filter
+# and aggregate weekly effort in an in-process database. Polars and DuckDB
+# are optional dependencies, see requirements.txt
+BACKEND = os.environ.get("GANTT_BACKEND", "pandas")
+if BACKEND == "polars":
+    from pipeline_polars import normalize_assignments, weekly_effort
+elif BACKEND == "duckdb":
+    from pipeline_duckdb import connect, query_weekly_effort
 
 # Set page config
 st.set_page_config(layout="wide")
 st.title("📊 Consultant Effort Gantt Chart Generator")
 
-# Upload Excel
-uploaded_file = st.file_uploader("Upload your Excel file", type=["xlsx", "xls"])
-
-if uploaded_file:
-    dataset = pd.read_excel(uploaded_file)
-
-    # Rename and clean columns
-    df = dataset.copy()
-    df = df.drop_duplicates()
-    df.rename(columns={
-        "ConsultantName": "Name",
-        "ProjectName": "Projects",
-        "Efforts_Percentage": "Effort",
-        "StartDate": "Start",
-        "EndDate": "End"
-    }, inplace=True)
-
-    def extract_skills(row):
-        core = str(row["CoreSkill"]).split(",") if pd.notnull(row["CoreSkill"]) else []
-        other = str(row["OtherSkills"]).split(",") if pd.notnull(row["OtherSkills"]) else []
-        return [skill.strip() for skill in core + other if skill.strip()]
-
-    df["Skill_List"] = df.apply(extract_skills, axis=1)
-    df = df.explode("Skill_List").rename(columns={"Skill_List": "Skill"})
-
-    # Convert to correct types
-    df['Start'] = pd.to_datetime(df['Start'])
-    df['End'] = pd.to_datetime(df['End'])
-    df['Effort'] = pd.to_numeric(df['Effort'], errors='coerce')
-    df = df.dropna(subset=['Start', 'End', 'Effort'])
-
-    # Expand into weeks
-    rows = []
-    for _, row in df.iterrows():
-        start = row['Start']
-        end = row['End']
-        effort = row['Effort']
-        project = row['Projects']
-        name = row['Name']
-        skill = row['Skill']
-
-        current_start = start
-        while current_start <= end:
-            week_start = current_start - pd.to_timedelta(current_start.weekday(), unit='d')
-            week_end = week_start + pd.Timedelta(days=6)
-
-            period_start = max(current_start, week_start)
-            period_end = min(end, week_end)
-
-            rows.append({
-                "Name": name,
-                "Projects": project,
-                "week_start": week_start,
-                "Start": period_start,
-                "End": period_end,
-                "Effort": effort,
-                "Skill": skill
-            })
-
-            current_start = week_end + pd.Timedelta(days=1)
-
-    expanded_df = pd.DataFrame(rows)
-
-    # Group and summarize
-    weekly_sum = (
-        expanded_df.groupby(['Name', 'week_start', 'Start', 'End', 'Skill'])
-        .agg({
-            'Effort': 'sum',
-            'Projects': lambda x: ', '.join(sorted(x.unique()))
-        })
-        .reset_index()
-        .rename(columns={'Effort': 'Effort%'})
-    )
+CHART_HEIGHT = 600
+
+BUCKET_LABELS = {"Day": "Daily", "Week": "Weekly", "Month": "Monthly", "Quarter": "Quarterly"}
+
+# Minor gridlines per bucket, as the first boundary and the spacing
+BUCKET_GRID = {
+    "Day": (EPOCH_MONDAY, 24 * 60 * 60 * 1000),
+    "Week": (EPOCH_MONDAY, 7 * 24 * 60 * 60 * 1000),
+    "Month": ("1970-01-01", "M1"),
+    "Quarter": ("1970-01-01", "M3")
+}
+
+# Parsed uploads are kept for an hour, and only the most recent few of them
+CACHE_TTL = 60 * 60
+CACHE_MAX_ENTRIES = 8
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def list_sheets(file_hash, _file_bytes):
+    return excel_sheets(_file_bytes)
+
+
+# Parse the files once per distinct set of uploads and sheets; a hash over
+# their contents is the cache key
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Reading files...")
+def load_uploads(file_hash, _uploads):
+    return read_uploads(_uploads)
+
+
+# The cleaned assignment intervals only depend on the upload, so they are
+# computed once per file; weekly rows are then built for the selected dates only.
+# With a base dataset, (hash, intervals) of an earlier upload, only rows that
+# changed since then are reprocessed
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Preparing assignments...")
+def prepare_intervals(file_hash, _dataset, _base=None):
+    if _base is not None:
+        return update_intervals(_base[1], _dataset)
+    return normalize_assignments(_dataset)
+
+
+# Built once per dataset and shared read-only between reruns and sessions
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def prepare_interval_index(file_hash, _intervals):
+    return build_interval_index(_intervals)
+
 
-    expanded_df = weekly_sum.copy()
+# With a base, (intervals, effort table) of an earlier upload for the same
+# window, only the consultant/skill pairs touched by changed rows are recomputed
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Preparing weekly effort...")
+def prepare_weekly_sum(file_hash, start_date, end_date, _intervals, _base=None):
+    if _base is not None:
+        base_intervals, base_sum = _base
+        return patch_effort(
+            base_sum, base_intervals, _intervals, lambda changed: weekly_effort(changed, start_date, end_date)
+        )
+    return weekly_effort(_intervals, start_date, end_date, prepare_interval_index(file_hash, _intervals))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Preparing effort...")
+def prepare_bucket_sum(file_hash, bucket, start_date, end_date, _intervals, _base=None):
+    if _base is not None:
+        base_intervals, base_sum = _base
+        return patch_effort(
+            base_sum, base_intervals, _intervals, lambda changed: bucket_effort(changed, bucket, start_date, end_date)
+        )
+    return bucket_effort(_intervals, bucket, start_date, end_date, prepare_interval_index(file_hash, _intervals))
+
+
+def remember_effort(file_hash, window, effort_df, base_hash=None):
+    # The session keeps its latest effort table per dataset and window, so a
+    # re-upload can patch the table at hand. Tables of other datasets than
+    # the current one and its base are dropped
+    tables = st.session_state.setdefault("effort_tables", {})
+    tables.pop((file_hash, window), None)
+    tables[(file_hash, window)] = effort_df
+    for key in list(tables):
+        if key[0] not in (file_hash, base_hash) or len(tables) > CACHE_MAX_ENTRIES:
+            del tables[key]
+
+
+# Built once per effort table and shared read-only between reruns and sessions
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def prepare_filter_index(file_hash, bucket, start_date, end_date, _effort_df):
+    return build_filter_index(_effort_df)
+
+
+# Consultant x week effort, built once per dataset for the heatmap and the
+# analytics below the chart
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def prepare_effort_matrix(file_hash, _intervals):
+    return build_effort_matrix(_intervals, skills=True)
+
+
+# One database per dataset, queried through its own cursor by every session
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Loading database...")
+def prepare_database(file_hash, _intervals):
+    return connect(file_hash, _intervals)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Querying weekly effort...")
+def query_weekly_sum(file_hash, start_date, end_date, names, skills, clip, _intervals):
+    return query_weekly_effort(prepare_database(file_hash, _intervals), start_date, end_date, names, skills, clip)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner="Loading saved dataset...")
+def load_saved_intervals(file_hash):
+    return load_intervals(file_hash)
+
+
+# Upload Excel, CSV, Parquet or Arrow
+uploaded_files = st.file_uploader("Upload your data file(s)", type=UPLOAD_TYPES, accept_multiple_files=True)
+
+intervals = None
+if uploaded_files:
+    # Every selected sheet of every file is one part; the parts are stacked
+    uploads = []
+    upload_hash = hashlib.sha256()
+    for i, uploaded_file in enumerate(uploaded_files):
+        file_bytes = uploaded_file.getvalue()
+        part_hash = hashlib.sha256(file_bytes).hexdigest()
+        if is_excel(uploaded_file.name):
+            sheets = list_sheets(part_hash, file_bytes)
+            if len(sheets) > 1:
+                # Keyed by position, as uploads may share a name and sheet list
+                sheets = st.multiselect(
+                    f"Sheets of {uploaded_file.name}", sheets, default=sheets[:1], key=f"sheets-{i}"
+                )
+        else:
+            sheets = [None]
+        for sheet in sheets:
+            uploads.append((uploaded_file.name, file_bytes, sheet))
+            upload_hash.update(f"{part_hash}:{uploaded_file.name}:{sheet};".encode())
+
+    if not uploads:
+        st.warning("Please select at least one sheet.")
+        st.stop()
+
+    file_hash = upload_hash.hexdigest()
+
+    # Incremental refresh diffs against the dataset shown before this one in
+    # the session, or else the last saved dataset
+    if st.session_state.get("current_dataset", (None,))[0] != file_hash:
+        st.session_state["base_dataset"] = st.session_state.get("current_dataset")
+    base = None
+    if st.checkbox("Only reprocess rows changed since the previous upload"):
+        base = st.session_state.get("base_dataset")
+        saved_hash = last_saved_hash()
+        if base is None and saved_hash not in (None, file_hash):
+            base = (saved_hash, load_saved_intervals(saved_hash))
+
+    try:
+        dataset, diagnostics = load_uploads(file_hash, uploads)
+        intervals = prepare_intervals(file_hash, dataset, base)
+    except ValueError as error:
+        st.error(str(error))
+        st.stop()
+    st.session_state["current_dataset"] = (file_hash, intervals)
+
+    # Saved as Parquet, the cleaned data reloads without parsing Excel again
+    if st.checkbox("Save this dataset for quick reload"):
+        save_intervals(file_hash, intervals)
+else:
+    saved_hash = last_saved_hash()
+    if saved_hash and st.checkbox("Load last saved dataset"):
+        file_hash = saved_hash
+        intervals = load_saved_intervals(file_hash)
+        diagnostics = {"Saved dataset": "Parquet store"}
+        base = None
+
+if intervals is not None:
+    with st.sidebar.expander("Diagnostics"):
+        for label, value in diagnostics.items():
+            st.markdown(f"**{label}:** {value}")
 
     # Sidebar Filters
     st.sidebar.header("Filters")
 
-    start_date = st.sidebar.date_input("Start Date", expanded_df['Start'].min())
-    end_date = st.sidebar.date_input("End Date", expanded_df['End'].max())
+    start_date = st.sidebar.date_input("Start Date", intervals['Start'].min())
+    end_date = st.sidebar.date_input("End Date", intervals['End'].max())
 
 #-Consultant name-------------------------------------------------------------------
 # Sidebar: Consultant Filter with conditional multiselect
-    consultant_list = sorted(expanded_df['Name'].unique())
+    consultant_list = sorted(intervals['Name'].dropna().unique())
     select_all = st.sidebar.checkbox("Select All Consultants", value=True)
 
     if select_all:
@@ -107,7 +226,7 @@ if uploaded_file:
 
 #-SKILL-------------------------------------------------------------------
 # Sidebar: Skill Filter with conditional multiselect
-    skills = sorted(expanded_df['Skill'].dropna().unique())
+    skills = sorted(intervals['Skill'].dropna().unique())
     select_all_skills = st.sidebar.checkbox("Select All Skills", value=True)
 
 # Always show the multiselect for skills
@@ -123,52 +242,123 @@ if uploaded_file:
 # Check if no skills are selected
     if not selected_skills:
         st.warning("Please select at least one skill.")
-#--------------------------------------------------------------------
 
+#-TIME BUCKET-------------------------------------------------------------------
+# Sidebar: Bucket size of the bars, picked from the date range by default
+    bucket = st.sidebar.selectbox(
+        "Time Bucket",
+        ["Auto", "Day", "Week", "Month", "Quarter"],
+        help="Auto shows weeks, or months and quarters for long date ranges."
+    )
+
+    clip_bars = st.sidebar.checkbox(
+        "Clip bars at the dates",
+        help="Keep bars that reach past the start or end date, cut at the date, instead of hiding them."
+    )
 
-    # Apply filters
-    filtered_df = expanded_df[
-        (expanded_df['Start'] >= pd.to_datetime(start_date)) &
-        (expanded_df['End'] <= pd.to_datetime(end_date)) &
-        (expanded_df['Name'].isin(consultant_names)) &
-        (expanded_df['Skill'].isin(selected_skills))
-    ]
-
-    # Plot Gantt Chart
-    fig = px.timeline(
-        filtered_df,
-        x_start="Start",
-        x_end="End",
-        y="Name",
-        color="Skill",
-        hover_data={
-            "Name": True,
-            "Effort%": ':.2f',
-            "Projects": True,
-            "Start": False,
-            "End": False,
-            "Skill": False
-        },
-        title="Gantt Chart: Weekly Effort per Consultant"
+#-RENDERER-------------------------------------------------------------------
+# Sidebar: SVG bars for small charts, WebGL once there are too many bars
+    renderer = st.sidebar.radio(
+        "Chart Renderer",
+        ["Auto", "SVG", "WebGL"],
+        help=f"Auto switches to WebGL above {WEBGL_BAR_THRESHOLD:,} bars."
     )
 
-    fig.update_yaxes(autorange="reversed")
-
-    # Weekly grid lines
-    min_date = filtered_df['Start'].min().normalize()
-    max_date = filtered_df['End'].max().normalize()
-    week_dates = pd.date_range(start=min_date, end=max_date, freq='W-MON')
-
-    for week in week_dates:
-        fig.add_shape(
-            type="line",
-            x0=week,
-            y0=0,
-            x1=week,
-            y1=1,
-            xref='x',
-            yref='paper',
-            line=dict(color="lightgrey", width=1)
+#-VIEW-------------------------------------------------------------------
+# Sidebar: Gantt bars, or a heatmap of the weekly load that stays readable
+# and fast for large rosters
+    view = st.sidebar.radio(
+        "Chart View",
+        ["Gantt", "Heatmap"],
+        help="The heatmap shows the total effort per week, one row per consultant or skill."
+    )
+    heatmap_rows = st.sidebar.radio("Heatmap Rows", ["Consultant", "Skill"], disabled=view != "Heatmap")
+#--------------------------------------------------------------------
+
+
+    # Load of the selected consultants in the weeks of the date range
+    effort_matrix = prepare_effort_matrix(file_hash, intervals)
+    weeks = week_columns(effort_matrix, start_date, end_date)
+    selected = np.isin(effort_matrix['names'], consultant_names)
+    load = effort_matrix['effort'][selected, weeks]
+
+    if view == "Heatmap":
+        if heatmap_rows == "Skill":
+            shown = np.isin(effort_matrix['skills'], selected_skills)
+            fig = utilization_heatmap(
+                skill_totals(effort_matrix, selected)[shown, weeks],
+                effort_matrix['skills'][shown],
+                effort_matrix['weeks'][weeks],
+                "Heatmap: Weekly Effort per Skill",
+                "Skill"
+            )
+        else:
+            fig = utilization_heatmap(
+                load,
+                effort_matrix['names'][selected],
+                effort_matrix['weeks'][weeks],
+                "Heatmap: Weekly Effort per Consultant",
+                "Name"
+            )
+            st.caption("Showing the total effort of each consultant over all of their skills.")
+        fig.update_yaxes(autorange="reversed")
+    else:
+        # Long date ranges are drawn in monthly or quarterly buckets
+        if bucket == "Auto":
+            bucket = choose_bucket(start_date, end_date)
+        if bucket == "Week" and BACKEND == "duckdb":
+            # Filters and weekly aggregation run as one query
+            filtered_df = query_weekly_sum(
+                file_hash, start_date, end_date, consultant_names, selected_skills, clip_bars, intervals
+            )
+        else:
+            # Incremental refresh patches the base's table for this window when
+            # the session still has it; recomputing that table first would be
+            # slower than a plain full computation
+            window = (bucket, start_date, end_date)
+            base_hash = base[0] if base is not None else None
+            base_sum = st.session_state.get("effort_tables", {}).get((base_hash, window))
+            patch_base = (base[1], base_sum) if base_sum is not None else None
+            if bucket == "Week":
+                expanded_df = prepare_weekly_sum(file_hash, start_date, end_date, intervals, patch_base)
+            else:
+                expanded_df = prepare_bucket_sum(file_hash, bucket, start_date, end_date, intervals, patch_base)
+                st.caption(f"Showing average effort per {bucket.lower()} for this date range.")
+            remember_effort(file_hash, window, expanded_df, base_hash)
+
+            # Apply filters
+            filter_index = prepare_filter_index(file_hash, bucket, start_date, end_date, expanded_df)
+            filtered_df = filter_rows(
+                expanded_df,
+                filter_index,
+                pd.to_datetime(start_date),
+                pd.to_datetime(end_date),
+                consultant_names,
+                selected_skills,
+                clip=clip_bars
+            )
+
+        # Plot Gantt Chart, one bar per run of identical weeks
+        bars_df = coalesce_weeks(filtered_df)
+        title = f"Gantt Chart: {BUCKET_LABELS[bucket]} Effort per Consultant"
+        if renderer == "WebGL" or (renderer == "Auto" and len(bars_df) > WEBGL_BAR_THRESHOLD):
+            fig = webgl_timeline(bars_df, title, CHART_HEIGHT)
+        else:
+            fig = svg_timeline(bars_df, title)
+
+        fig.update_yaxes(autorange="reversed")
+
+        # Grid lines on every bucket boundary, drawn by the axis as minor
+        # gridlines so the figure does not carry one layout shape per bucket
+        grid_start, grid_step = BUCKET_GRID[bucket]
+        fig.update_xaxes(
+            minor=dict(
+                tick0=grid_start,
+                dtick=grid_step,
+                showgrid=True,
+                gridcolor="lightgrey",
+                gridwidth=1
+            )
         )
 
     # Today line
@@ -195,7 +385,7 @@ if uploaded_file:
     )
 
     fig.update_layout(
-        height=600,
+        height=CHART_HEIGHT,
         xaxis=dict(
             tickformat="%b %d",
             tickangle=-45
@@ -209,6 +399,21 @@ if uploaded_file:
 
     st.plotly_chart(fig, use_container_width=True)
 
+    with st.expander("Utilization"):
+        st.line_chart(
+            pd.Series(load.sum(axis=0), index=effort_matrix['weeks'][weeks], name="Total Effort%"),
+            x_label="Week",
+            y_label="Total Effort%"
+        )
+        overbooked = (load > 100).sum(axis=1) > 0
+        st.markdown(f"**Consultants over 100%:** {overbooked.sum()} of {selected.sum()}")
+        if overbooked.any():
+            st.dataframe(pd.DataFrame({
+                "Consultant": effort_matrix['names'][selected][overbooked],
+                "Peak Effort%": load[overbooked].max(axis=1),
+                "Weeks over 100%": (load[overbooked] > 100).sum(axis=1)
+            }), hide_index=True)
+
 
 #run locally    
 # python -m streamlit run app.py
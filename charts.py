@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Above this many bars the SVG timeline gets too slow to pan and zoom
+WEBGL_BAR_THRESHOLD = 10_000
+
+
+def skill_colors(bars_df):
+    # Same assignment Plotly Express makes: palette order by first appearance
+    palette = px.colors.qualitative.Plotly
+    return {skill: palette[i % len(palette)] for i, skill in enumerate(bars_df['Skill'].unique())}
+
+
+def svg_timeline(bars_df, title):
+    return px.timeline(
+        bars_df,
+        x_start="Start",
+        x_end="End",
+        y="Name",
+        color="Skill",
+        color_discrete_map=skill_colors(bars_df),
+        hover_data={
+            "Name": True,
+            "Effort%": ':.2f',
+            "Projects": True,
+            "Start": False,
+            "End": False,
+            "Skill": False
+        },
+        title=title
+    )
+
+
+def webgl_timeline(bars_df, title, height):
+    # Every bar is a thick line segment of a Scattergl trace per skill. Lines
+    # only hover on their points, so each bar also gets a point in the middle
+    fig = go.Figure()
+    colors = skill_colors(bars_df)
+    names = bars_df['Name'].unique()
+    width = max(1, min(20, 0.8 * height / max(len(names), 1)))
+
+    for skill, bars in bars_df.groupby('Skill', observed=True, sort=False):
+        n = len(bars)
+        start = bars['Start'].to_numpy()
+        end = bars['End'].to_numpy()
+
+        x = np.full(4 * n, None, dtype=object)
+        x[0::4] = pd.to_datetime(start)
+        x[1::4] = pd.to_datetime(start + (end - start) / 2)
+        x[2::4] = pd.to_datetime(end)
+        y = np.repeat(bars['Name'].astype(str).to_numpy(dtype=object), 4)
+        y[3::4] = None
+        customdata = np.repeat(bars[['Name', 'Effort%', 'Projects']].astype(object).to_numpy(), 4, axis=0)
+
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            customdata=customdata,
+            mode="lines",
+            line=dict(color=colors[skill], width=width),
+            name=str(skill),
+            legendgroup=str(skill),
+            hovertemplate="Name=%{customdata[0]}<br>Effort%=%{customdata[1]:.2f}<br>Projects=%{customdata[2]}"
+        ))
+
+    fig.update_layout(title=title, legend_title_text="Skill")
+    fig.update_yaxes(type="category", categoryorder="array", categoryarray=[str(name) for name in names])
+    return fig
+
+
+def utilization_heatmap(effort, rows, weeks, title, row_label):
+    # One trace for the whole grid, so the cost does not grow with the roster
+    fig = go.Figure(go.Heatmap(
+        z=effort,
+        x=weeks,
+        y=[str(row) for row in rows],
+        colorscale="YlOrRd",
+        zmin=0,
+        colorbar=dict(title="Effort%"),
+        hovertemplate=f"{row_label}=%{{y}}<br>Week of %{{x|%b %d, %Y}}<br>Effort%=%{{z:.2f}}<extra></extra>"
+    ))
+    fig.update_layout(title=title)
+    fig.update_yaxes(type="category")
+    return fig
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+def pack_rows(rows, row_count):
+    # Bit-packed row set: bit i (big-endian within each byte) is row i
+    mask = np.zeros(row_count, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+def build_bitmap_index(column):
+    """Rows of every distinct value, compressed roaring-style.
+
+    A value holding more than 1/32 of the rows gets a packed bitmap of the
+    whole table; rarer values keep their uint32 row positions, which are
+    smaller than the bitmap then.
+    """
+    row_count = len(column)
+    bitmaps = {}
+    positions = {}
+    for value, rows in column.groupby(column, observed=True).indices.items():
+        if len(rows) * 32 > row_count:
+            bitmaps[value] = pack_rows(rows, row_count)
+        else:
+            positions[value] = rows.astype(np.uint32)
+    return {'row_count': row_count, 'bitmaps': bitmaps, 'positions': positions}
+
+
+def union_rows(index, values):
+    # OR of the row sets of the selected values, or None when that is all rows
+    if set(index['bitmaps']) | set(index['positions']) <= set(values):
+        return None
+    selected = np.zeros((index['row_count'] + 7) // 8, dtype=np.uint8)
+    sparse = []
+    for value in set(values):
+        if value in index['bitmaps']:
+            selected |= index['bitmaps'][value]
+        elif value in index['positions']:
+            sparse.append(index['positions'][value])
+    if sparse:
+        selected |= pack_rows(np.concatenate(sparse), index['row_count'])
+    return selected
+
+
+def build_interval_index(df):
+    """Start-sorted Start/End intervals, augmented with the running maximum End."""
+    start = df['Start'].to_numpy()
+    order = np.argsort(start, kind="stable")
+    sorted_end = df['End'].to_numpy()[order]
+    return {
+        'order': order,
+        'sorted_start': start[order],
+        'sorted_end': sorted_end,
+        'max_end': np.maximum.accumulate(sorted_end)
+    }
+
+
+def overlapping(index, lo, hi):
+    # Positions of the intervals with Start <= hi and End >= lo. Those are
+    # start-sorted, so a binary search cuts off everything starting after hi;
+    # the running maximum End is sorted as well, so a second one skips the
+    # leading intervals that all end before lo
+    first = np.searchsorted(index['max_end'], lo, side='left')
+    last = np.searchsorted(index['sorted_start'], hi, side='right')
+    hits = first + np.flatnonzero(index['sorted_end'][first:last] >= lo)
+    return np.sort(index['order'][hits])
+
+
+def contained(index, lo, hi):
+    # Positions of the intervals with Start >= lo and End <= hi
+    first = np.searchsorted(index['sorted_start'], lo, side='left')
+    last = np.searchsorted(index['sorted_start'], hi, side='right')
+    hits = first + np.flatnonzero(index['sorted_end'][first:last] <= hi)
+    return np.sort(index['order'][hits])
+
+
+def build_filter_index(df):
+    """Row sets of an effort table by date, consultant and skill."""
+    return {
+        'window': build_interval_index(df),
+        'by_name': build_bitmap_index(df['Name']),
+        'by_skill': build_bitmap_index(df['Skill'])
+    }
+
+
+def filter_rows(df, index, start_date, end_date, names, skills, clip=False):
+    """Rows inside the dates with a selected name and skill.
+
+    Rows reaching past either date are dropped, or with `clip` kept and cut
+    at the dates.
+    """
+    start_date = np.datetime64(start_date, 'ns')
+    end_date = np.datetime64(end_date, 'ns')
+    if clip:
+        in_window = overlapping(index['window'], start_date, end_date)
+    else:
+        in_window = contained(index['window'], start_date, end_date)
+
+    selected = pack_rows(in_window, len(df))
+    for by_value, values in [(index['by_name'], names), (index['by_skill'], skills)]:
+        value_rows = union_rows(by_value, values)
+        if value_rows is not None:
+            selected &= value_rows
+
+    filtered_df = df.iloc[np.flatnonzero(np.unpackbits(selected, count=len(df)))]
+    if clip:
+        filtered_df = filtered_df.assign(
+            Start=filtered_df['Start'].clip(lower=start_date),
+            End=filtered_df['End'].clip(upper=end_date)
+        )
+    return filtered_df
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from pipeline import week_index, week_monday
+
+
+def sweep_weeks(rows, first, last, effort, row_count, week_count):
+    # Difference array per row: +Effort in the first week, -Effort after the
+    # last, then a running sum along the weeks
+    diff = np.zeros((row_count, week_count + 1))
+    np.add.at(diff, (rows, first), effort)
+    np.add.at(diff, (rows, last + 1), -effort)
+    return np.cumsum(diff[:, :-1], axis=1).round(9)
+
+
+def build_effort_matrix(intervals, skills=False):
+    """Effort% per consultant and week over the whole dataset.
+
+    A source row spread over several skills counts once. With `skills` the
+    consultant x skill x week effort is added as well, compressed like a CSR
+    matrix: `skill_ptr[i]:skill_ptr[i + 1]` are the rows of consultant i in
+    `skill_codes` (the skill of each row) and `skill_effort` (its weeks), so
+    only skills a consultant actually has take up space.
+    """
+    # A missing name would get code -1 and land in the last consultant's row
+    intervals = intervals[intervals['Name'].notna()]
+    name_codes, names = pd.factorize(intervals['Name'], sort=True)
+    first = week_index(intervals['Start'])
+    last = week_index(intervals['End'])
+    first_week = first.min() if len(intervals) else 0
+    week_count = last.max() - first_week + 1 if len(intervals) else 0
+    first -= first_week
+    last -= first_week
+
+    rows = ~intervals['row_hash'].duplicated().to_numpy()
+    matrix = {
+        'names': np.asarray(names),
+        'weeks': week_monday(np.arange(first_week, first_week + week_count)),
+        'effort': sweep_weeks(
+            name_codes[rows], first[rows], last[rows], intervals['Effort'].to_numpy()[rows],
+            len(names), week_count
+        )
+    }
+    if skills:
+        skill_codes, skill_names = pd.factorize(intervals['Skill'], sort=True)
+        skilled = skill_codes >= 0
+        pairs, pair_rows = np.unique(
+            name_codes[skilled] * len(skill_names) + skill_codes[skilled], return_inverse=True
+        )
+        matrix.update({
+            'skills': np.asarray(skill_names),
+            'skill_ptr': np.searchsorted(pairs // len(skill_names), np.arange(len(names) + 1)),
+            'skill_codes': pairs % len(skill_names),
+            'skill_effort': sweep_weeks(
+                pair_rows, first[skilled], last[skilled], intervals['Effort'].to_numpy()[skilled],
+                len(pairs), week_count
+            )
+        })
+    return matrix
+
+
+def week_columns(matrix, start_date, end_date):
+    """Slice of the matrix columns for the weeks overlapping the dates."""
+    mondays = matrix['weeks']
+    start_date = np.datetime64(pd.Timestamp(start_date).normalize(), 'ns')
+    end_date = np.datetime64(pd.Timestamp(end_date).normalize(), 'ns')
+    return slice(
+        np.searchsorted(mondays, start_date - np.timedelta64(6, 'D')),
+        np.searchsorted(mondays, end_date, side='right')
+    )
+
+
+def skill_totals(matrix, consultants=None):
+    """Effort% per skill and week, summed over the consultants.
+
+    `consultants` is an optional boolean mask over `matrix['names']`.
+    """
+    rows = slice(None)
+    if consultants is not None:
+        rows = np.repeat(consultants, np.diff(matrix['skill_ptr']))
+    totals = np.zeros((len(matrix['skills']), matrix['skill_effort'].shape[1]))
+    np.add.at(totals, matrix['skill_codes'][rows], matrix['skill_effort'][rows])
+    return totals
@@ -0,0 +1,391 @@
+import numpy as np
+import pandas as pd
+
+from indexes import overlapping
+
+
+COLUMN_NAMES = {
+    "ConsultantName": "Name",
+    "ProjectName": "Projects",
+    "Efforts_Percentage": "Effort",
+    "StartDate": "Start",
+    "EndDate": "End"
+}
+
+# Columns an upload must have; anything else in it is ignored
+SOURCE_COLUMNS = list(COLUMN_NAMES) + ["CoreSkill", "OtherSkills"]
+
+# Columns kept on the interval table, one row per assignment and skill.
+# row_hash identifies the upload row an interval came from
+INTERVAL_COLUMNS = ['Name', 'Projects', 'Skill', 'Start', 'End', 'Effort', 'row_hash']
+
+# Repeated on every week row, so they are stored once per distinct value
+CATEGORY_COLUMNS = ['Name', 'Projects', 'Skill']
+
+# Weeks are numbered from this Monday so they can be used as array offsets
+EPOCH_MONDAY = pd.Timestamp("1970-01-05")
+
+# The finest bucket whose count across the date window stays within this is
+# used, so the number of bars follows the screen rather than the data span
+MAX_BUCKETS = 80
+
+
+def split_skills(df):
+    # One row per distinct skill listed in CoreSkill or OtherSkills. Rows
+    # without any skill are dropped, as the weekly groupby would drop them anyway
+    skills = (
+        pd.concat([df["CoreSkill"].dropna(), df["OtherSkills"].dropna()])
+        .astype(str)
+        .str.split(",")
+        .explode()
+        .str.strip()
+    )
+    skills = skills[skills != ""].sort_index(kind="stable")
+    skills = skills[~pd.MultiIndex.from_arrays([skills.index, skills]).duplicated()]
+    return df.join(skills.rename("Skill"), how="inner")
+
+
+def check_columns(dataset, source="The file"):
+    missing = [column for column in SOURCE_COLUMNS if column not in dataset.columns]
+    if missing:
+        raise ValueError(f"{source} is missing required column(s): {', '.join(missing)}")
+
+
+def source_rows(dataset):
+    check_columns(dataset)
+    df = dataset[SOURCE_COLUMNS].drop_duplicates(ignore_index=True)
+    df['row_hash'] = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return df
+
+
+def categorize(df):
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype(str).where(df[column].notna()).astype("category")
+    return df
+
+
+def build_intervals(rows):
+    # Rename and clean columns
+    df = rows.rename(columns=COLUMN_NAMES)
+
+    df = split_skills(df)
+
+    # Convert to correct types. Assignments are tracked at day resolution
+    df['Start'] = pd.to_datetime(df['Start']).dt.normalize()
+    df['End'] = pd.to_datetime(df['End']).dt.normalize()
+    df['Effort'] = pd.to_numeric(df['Effort'], errors='coerce')
+    # Rows without a consultant never show up in the chart
+    df = df.dropna(subset=['Name', 'Start', 'End', 'Effort'])
+    df = df[df['Start'] <= df['End']]
+
+    return categorize(df[INTERVAL_COLUMNS].reset_index(drop=True))
+
+
+def normalize_assignments(dataset):
+    return build_intervals(source_rows(dataset))
+
+
+def update_intervals(previous, dataset):
+    """Intervals of `dataset`, only rebuilding rows that are not in `previous`."""
+    rows = source_rows(dataset)
+    kept = previous[previous['row_hash'].isin(rows['row_hash'])]
+    added = build_intervals(rows[~rows['row_hash'].isin(previous['row_hash'])])
+    return stack_categorical([kept, added], CATEGORY_COLUMNS)
+
+
+def stack_categorical(frames, columns):
+    # Concatenate frames whose category columns have different categories.
+    # The categories are merged first, which only remaps the codes, so the
+    # columns never go through object strings
+    for column in columns:
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[column].cat.categories)
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def changed_pairs(previous, intervals):
+    # Name/Skill pairs that gained or lost an interval between two versions
+    removed = previous[~previous['row_hash'].isin(intervals['row_hash'])]
+    added = intervals[~intervals['row_hash'].isin(previous['row_hash'])]
+    changed = pd.concat([removed[['Name', 'Skill']].astype(str), added[['Name', 'Skill']].astype(str)])
+    return pd.MultiIndex.from_frame(changed.drop_duplicates())
+
+
+def pair_rows(df, pairs):
+    # Rows whose Name/Skill pair is one of `pairs`. The index is built on the
+    # category codes, so only the categories are compared as strings
+    return pd.MultiIndex.from_arrays([df['Name'], df['Skill']]).isin(pairs)
+
+
+def patch_effort(previous_sum, previous, intervals, compute):
+    """Update an effort table of `previous` to `intervals` by recomputing changed pairs only.
+
+    Recomputed rows are appended at the end rather than sorted into place.
+    """
+    changed = changed_pairs(previous, intervals)
+    kept = previous_sum[~pair_rows(previous_sum, changed)]
+    recomputed = compute(intervals[pair_rows(intervals, changed)])
+    return stack_categorical([kept, recomputed], ['Name', 'Skill'])
+
+
+def day_index(dates):
+    return ((dates - EPOCH_MONDAY) // pd.Timedelta(days=1)).to_numpy(dtype=np.int32)
+
+
+def day_start(index):
+    return (EPOCH_MONDAY + pd.to_timedelta(index.astype(np.int64), unit='D')).to_numpy()
+
+
+def week_index(dates):
+    return ((dates - EPOCH_MONDAY) // pd.Timedelta(days=7)).to_numpy(dtype=np.int32)
+
+
+def week_monday(index):
+    return (EPOCH_MONDAY + pd.to_timedelta(index.astype(np.int64) * 7, unit='D')).to_numpy()
+
+
+def month_index(dates):
+    return dates.to_numpy().astype('datetime64[M]').astype(np.int32)
+
+
+def month_start(index):
+    return index.astype(np.int64).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def quarter_index(dates):
+    return month_index(dates) // 3
+
+
+def quarter_start(index):
+    return month_start(index * 3)
+
+
+# Time buckets, finest first: how dates map to consecutive bucket numbers
+# and how a bucket number maps back to the first day of that bucket
+BUCKETS = {
+    "Day": (day_index, day_start),
+    "Week": (week_index, week_monday),
+    "Month": (month_index, month_start),
+    "Quarter": (quarter_index, quarter_start)
+}
+
+
+def expand_buckets(df, bucket):
+    # One row per assignment-skill and bucket it touches. The first row
+    # starts on the assignment start, the following ones on the first day of
+    # their bucket, and every row is cut at the assignment end
+    to_index, to_start = BUCKETS[bucket]
+    first_bucket = to_index(df['Start'])
+    bucket_count = to_index(df['End']) - first_bucket + 1
+
+    row_pos = np.repeat(np.arange(len(df)), bucket_count)
+    bucket_offset = np.arange(len(row_pos)) - np.repeat(np.cumsum(bucket_count) - bucket_count, bucket_count)
+    bucket_index = first_bucket[row_pos] + bucket_offset
+
+    bucket_start = to_start(bucket_index)
+    period_start = np.where(bucket_offset == 0, df['Start'].to_numpy()[row_pos], bucket_start)
+    period_end = np.minimum(df['End'].to_numpy()[row_pos], to_start(bucket_index + 1) - np.timedelta64(1, 'D'))
+
+    return pd.DataFrame({
+        "Name": df['Name'].array.take(row_pos),
+        "Projects": df['Projects'].array.take(row_pos),
+        "bucket_start": bucket_start,
+        "Start": period_start,
+        "End": period_end,
+        "Effort": df['Effort'].to_numpy()[row_pos],
+        "Skill": df['Skill'].array.take(row_pos)
+    })
+
+
+def expand_weeks(df):
+    # Expand into Monday-based weeks
+    return expand_buckets(df, "Week").rename(columns={"bucket_start": "week_start"})
+
+
+def join_projects(df, group):
+    # Sorted, comma separated distinct projects of every group. The strings
+    # are built one position at a time over all groups at once: the first
+    # project of each group, then ", " and the second one where there is one,
+    # and so on, so the loop runs as often as the longest project list.
+    # Rows in a group the groupby dropped, for a missing key, have no code
+    valid = ~np.isnan(group)
+    group = group[valid].astype(np.int64)
+    projects = df['Projects'][valid]
+    pairs = (
+        pd.DataFrame({'group': group, 'project': projects.astype(str).where(projects.notna())})
+        .dropna()
+        .drop_duplicates()
+        .sort_values(['group', 'project'])
+    )
+    groups = pairs['group'].to_numpy()
+    projects = pairs['project'].to_numpy(dtype=object)
+    position = pairs.groupby('group').cumcount().to_numpy()
+
+    joined = np.full(group.max() + 1 if len(group) else 0, '', dtype=object)
+    for i in range(position.max() + 1 if len(position) else 0):
+        at = position == i
+        joined[groups[at]] = joined[groups[at]] + ('' if i == 0 else ', ') + projects[at]
+    return joined
+
+
+def aggregate_weekly(expanded_df):
+    # Group and summarize
+    keys = ['Name', 'week_start', 'Start', 'End', 'Skill']
+    grouped = expanded_df.groupby(keys, observed=True)
+    weekly_sum = (
+        grouped['Effort'].sum()
+        .reset_index()
+        .rename(columns={'Effort': 'Effort%'})
+    )
+    weekly_sum['Projects'] = join_projects(expanded_df, grouped.ngroup().to_numpy())
+    return weekly_sum
+
+
+def sum_full_weeks(df, begin, stop):
+    # Sweep a difference array over week indices: every interval adds its
+    # Effort at week `begin` and removes it at week `stop`. The running sum per
+    # Name/Skill/Projects is constant between events, so each step is repeated
+    # once per week it covers instead of once per week per interval
+    keys = ['Name', 'Skill', 'Projects']
+    key = df.groupby(keys, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    effort = df['Effort'].to_numpy(dtype=float)
+    events = (
+        pd.DataFrame({
+            'key': np.concatenate([key, key]),
+            'week': np.concatenate([begin, stop]),
+            'Effort': np.concatenate([effort, -effort]),
+            'active': np.concatenate([np.ones(len(df), dtype=np.int32), -np.ones(len(df), dtype=np.int32)])
+        })
+        .groupby(['key', 'week'])
+        .sum()
+        .reset_index()
+    )
+    running = events.groupby('key')[['Effort', 'active']].cumsum()
+    # The last event of every key closes all of its intervals, so the
+    # shifted week never reaches across two keys for an active step
+    step_weeks = (events['week'].shift(-1) - events['week']).to_numpy()
+    active = (running['active'] > 0).to_numpy()
+
+    step_weeks = step_weeks[active].astype(np.int32)
+    step_pos = np.repeat(np.arange(len(step_weeks)), step_weeks)
+    week_offset = np.arange(len(step_pos)) - np.repeat(np.cumsum(step_weeks) - step_weeks, step_weeks)
+    week = events['week'].to_numpy()[active][step_pos] + week_offset
+    # Adding and removing efforts leaves float noise on the running sum
+    step_effort = running['Effort'].to_numpy()[active].round(9)
+
+    _, first_row = np.unique(key, return_index=True)
+    key_values = df[keys].iloc[first_row]
+    step_key = events['key'].to_numpy()[active][step_pos]
+    week_start = week_monday(week)
+    return pd.DataFrame({
+        "Name": key_values['Name'].array.take(step_key),
+        "Projects": key_values['Projects'].array.take(step_key),
+        "week_start": week_start,
+        "Start": week_start,
+        "End": week_start + np.timedelta64(6, 'D'),
+        "Effort": step_effort[step_pos],
+        "Skill": key_values['Skill'].array.take(step_key)
+    })
+
+
+def in_window(intervals, lo, hi, interval_index=None):
+    # Intervals overlapping [lo, hi]; with an interval index that is a lookup
+    # instead of a scan
+    if interval_index is None:
+        return intervals[(intervals['Start'] <= hi) & (intervals['End'] >= lo)]
+    return intervals.iloc[overlapping(interval_index, lo.to_datetime64(), hi.to_datetime64())]
+
+
+def weekly_effort(intervals, window_start, window_end, interval_index=None):
+    """Weekly effort per consultant and skill for the weeks overlapping the window."""
+    # Widen the window to whole weeks so clipping never changes a week row
+    lo = pd.Timestamp(window_start).normalize()
+    lo -= pd.Timedelta(days=lo.weekday())
+    hi = pd.Timestamp(window_end).normalize()
+    hi += pd.Timedelta(days=6 - hi.weekday())
+
+    df = in_window(intervals, lo, hi, interval_index)
+    df = df.assign(Start=df['Start'].clip(lower=lo), End=df['End'].clip(upper=hi))
+    first_week = week_index(df['Start'])
+    last_week = week_index(df['End'])
+
+    # The first and last week of an interval can be partial, so those rows
+    # are expanded one by one
+    head = df.assign(End=np.minimum(df['End'].to_numpy(), week_monday(first_week) + np.timedelta64(6, 'D')))
+    multi_week = last_week > first_week
+    tail = df[multi_week].assign(Start=week_monday(last_week[multi_week]))
+    edges = expand_weeks(pd.concat([head, tail]))
+
+    # Full weeks in between only need the summed effort per week
+    inner = last_week - first_week >= 2
+    full_weeks = sum_full_weeks(df[inner], first_week[inner] + 1, last_week[inner])
+
+    return aggregate_weekly(pd.concat([edges, full_weeks], ignore_index=True))
+
+
+def coalesce_weeks(weekly_sum):
+    # Fuse back-to-back week (or month, quarter) rows of a consultant and
+    # skill that carry the same effort and projects into a single bar
+    df = weekly_sum.sort_values(['Name', 'Skill', 'Start', 'End'])
+    previous = df.shift()
+    continues = (
+        (df['Name'] == previous['Name']) &
+        (df['Skill'] == previous['Skill']) &
+        (df['Effort%'] == previous['Effort%']) &
+        (df['Projects'] == previous['Projects']) &
+        (df['Start'] == previous['End'] + pd.Timedelta(days=1))
+    )
+    return (
+        df.groupby((~continues).cumsum().to_numpy(), sort=False)
+        .agg({column: 'last' if column == 'End' else 'first' for column in df.columns})
+        .reset_index(drop=True)
+    )
+
+
+def choose_bucket(window_start, window_end):
+    # Auto starts from weeks; days are only drawn when asked for
+    window = pd.Series([pd.Timestamp(window_start).normalize(), pd.Timestamp(window_end).normalize()])
+    for bucket in ["Week", "Month"]:
+        to_index, _ = BUCKETS[bucket]
+        first, last = to_index(window)
+        if last - first + 1 <= MAX_BUCKETS:
+            return bucket
+    return "Quarter"
+
+
+def bucket_effort(intervals, bucket, window_start, window_end, interval_index=None):
+    """Average effort per consultant, skill and bucket of the window."""
+    # Every interval is cut at the bucket boundaries and weighted by the days
+    # it covers; dividing by the days of the bucket inside the window gives
+    # the average effort, so a half-staffed month reads as half the effort
+    lo = pd.Timestamp(window_start).normalize()
+    hi = pd.Timestamp(window_end).normalize()
+    to_index, to_start = BUCKETS[bucket]
+
+    df = in_window(intervals, lo, hi, interval_index)
+    df = df.assign(Start=df['Start'].clip(lower=lo), End=df['End'].clip(upper=hi))
+    expanded_df = expand_buckets(df, bucket)
+
+    bucket_index = to_index(expanded_df['bucket_start'])
+    bucket_start = np.maximum(to_start(bucket_index), lo.to_datetime64())
+    bucket_end = np.minimum(to_start(bucket_index + 1) - np.timedelta64(1, 'D'), hi.to_datetime64())
+    covered_days = (expanded_df['End'] - expanded_df['Start']).dt.days.to_numpy() + 1
+    bucket_days = (bucket_end - bucket_start) // np.timedelta64(1, 'D') + 1
+    expanded_df = expanded_df.assign(
+        Start=bucket_start,
+        End=bucket_end,
+        Effort=expanded_df['Effort'].to_numpy() * covered_days / bucket_days
+    )
+
+    keys = ['Name', 'Start', 'End', 'Skill']
+    grouped = expanded_df.groupby(keys, observed=True)
+    bucket_sum = (
+        grouped['Effort'].sum()
+        .round(9)
+        .reset_index()
+        .rename(columns={'Effort': 'Effort%'})
+    )
+    bucket_sum['Projects'] = join_projects(expanded_df, grouped.ngroup().to_numpy())
+    return bucket_sum
@@ -0,0 +1,106 @@
+import duckdb
+import pandas as pd
+
+from store import STORE_DIR, STORE_MAX_DATASETS
+
+WEEKLY_QUERY = """
+WITH windowed AS (
+    SELECT
+        Name::VARCHAR AS Name,
+        Projects::VARCHAR AS Projects,
+        Skill::VARCHAR AS Skill,
+        greatest(Start, $lo) AS Start,
+        least("End", $hi) AS "End",
+        Effort
+    FROM intervals
+    WHERE Start <= $hi AND "End" >= $lo
+        AND list_contains($names, Name::VARCHAR)
+        AND list_contains($skills, Skill::VARCHAR)
+),
+weeks AS (
+    SELECT
+        *,
+        unnest(generate_series(date_trunc('week', Start), date_trunc('week', "End"), INTERVAL 7 DAY)) AS week_start
+    FROM windowed
+),
+weekly AS (
+    SELECT
+        Name,
+        week_start,
+        greatest(Start, week_start) AS Start,
+        least("End", week_start + INTERVAL 6 DAY) AS "End",
+        Skill,
+        sum(Effort) AS "Effort%",
+        coalesce(string_agg(DISTINCT Projects, ', ' ORDER BY Projects), '') AS Projects
+    FROM weeks
+    GROUP BY ALL
+)
+SELECT
+    Name,
+    week_start,
+    CASE WHEN $clip THEN greatest(Start, $start_date) ELSE Start END AS Start,
+    CASE WHEN $clip THEN least("End", $end_date) ELSE "End" END AS "End",
+    Skill,
+    "Effort%",
+    Projects
+FROM weekly
+WHERE CASE WHEN $clip
+    THEN Start <= $end_date AND "End" >= $start_date
+    ELSE Start >= $start_date AND "End" <= $end_date
+END
+ORDER BY Name, week_start, weekly.Start, weekly."End", Skill
+"""
+
+
+def database_path(file_hash):
+    return STORE_DIR / f"{file_hash}.duckdb"
+
+
+def connect(file_hash, intervals):
+    """Database file under the store holding the intervals of one dataset."""
+    path = database_path(file_hash)
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    # File-backed, so the table is paged in from disk as queries need it
+    # rather than held in memory next to the pandas frame; aggregations
+    # larger than memory spill to the store as well
+    con = duckdb.connect(str(path), config={"temp_directory": str(STORE_DIR / "duckdb_tmp")})
+    # Copied into a table rather than registered, as registered frames are not
+    # visible to the cursors queries run on. A file from an earlier run
+    # already has it
+    con.register("upload", intervals)
+    con.execute("CREATE TABLE IF NOT EXISTS intervals AS SELECT * FROM upload")
+    con.unregister("upload")
+    con.execute("CHECKPOINT")
+    path.touch()
+
+    saved = sorted(STORE_DIR.glob("*.duckdb"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in saved[STORE_MAX_DATASETS:]:
+        stale.unlink(missing_ok=True)
+        stale.with_suffix(".duckdb.wal").unlink(missing_ok=True)
+    return con
+
+
+def query_weekly_effort(con, start_date, end_date, names, skills, clip=False):
+    """Filtered weekly effort, computed by the database.
+
+    Same rows as pipeline.weekly_effort followed by indexes.filter_rows.
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    # Widen the window to whole weeks so clipping never changes a week row
+    lo = start_date.normalize() - pd.Timedelta(days=start_date.weekday())
+    hi = end_date.normalize() + pd.Timedelta(days=6 - end_date.weekday())
+
+    # A cursor per query, as the connection is shared between sessions
+    weekly_sum = con.cursor().execute(WEEKLY_QUERY, {
+        "lo": lo.to_pydatetime(),
+        "hi": hi.to_pydatetime(),
+        "start_date": start_date.to_pydatetime(),
+        "end_date": end_date.to_pydatetime(),
+        "names": [str(name) for name in names],
+        "skills": [str(skill) for skill in skills],
+        "clip": clip
+    }).df()
+    for column in ['Name', 'Skill']:
+        weekly_sum[column] = weekly_sum[column].astype("category")
+    return weekly_sum
@@ -0,0 +1,83 @@
+import pandas as pd
+import polars as pl
+
+from pipeline import INTERVAL_COLUMNS, categorize, in_window, source_rows
+
+
+def to_polars(rows):
+    # Uploads come in as pandas frames with loosely typed object columns, so
+    # they are typed the same way as in the pandas pipeline before crossing over
+    text = {column: rows[column].astype(str).where(rows[column].notna())
+            for column in ["ConsultantName", "ProjectName", "CoreSkill", "OtherSkills"]}
+    return pl.from_pandas(pd.DataFrame({
+        "Name": text["ConsultantName"],
+        "Projects": text["ProjectName"],
+        "Effort": pd.to_numeric(rows["Efforts_Percentage"], errors='coerce'),
+        "Start": pd.to_datetime(rows["StartDate"]).dt.normalize(),
+        "End": pd.to_datetime(rows["EndDate"]).dt.normalize(),
+        "CoreSkill": text["CoreSkill"],
+        "OtherSkills": text["OtherSkills"],
+        "row_hash": rows["row_hash"]
+    }))
+
+
+def normalize_assignments(dataset):
+    """Polars version of pipeline.normalize_assignments."""
+    skills = pl.concat_list([
+        pl.col("CoreSkill").fill_null("").str.split(","),
+        pl.col("OtherSkills").fill_null("").str.split(",")
+    ])
+    intervals = (
+        to_polars(source_rows(dataset))
+        .lazy()
+        .with_columns(Skill=skills)
+        .explode("Skill")
+        .with_columns(pl.col("Skill").str.strip_chars())
+        .filter(pl.col("Skill") != "")
+        .unique(subset=["row_hash", "Skill"], maintain_order=True)
+        .drop_nulls(subset=["Name", "Start", "End", "Effort"])
+        .filter(pl.col("Start") <= pl.col("End"))
+        .select(INTERVAL_COLUMNS)
+        .collect()
+    )
+    return categorize(intervals.to_pandas())
+
+
+def weekly_effort(intervals, window_start, window_end, interval_index=None):
+    """Polars version of pipeline.weekly_effort."""
+    # Widen the window to whole weeks so clipping never changes a week row
+    lo = pd.Timestamp(window_start).normalize()
+    lo -= pd.Timedelta(days=lo.weekday())
+    hi = pd.Timestamp(window_end).normalize()
+    hi += pd.Timedelta(days=6 - hi.weekday())
+
+    df = in_window(intervals, lo, hi, interval_index)
+    keys = ['Name', 'week_start', 'Start', 'End', 'Skill']
+    weekly_sum = (
+        pl.from_pandas(df.astype({'Name': str, 'Projects': str, 'Skill': str}))
+        .lazy()
+        .with_columns(
+            pl.col("Start").clip(lower_bound=lo.to_pydatetime()),
+            pl.col("End").clip(upper_bound=hi.to_pydatetime())
+        )
+        # One row per Monday-based week the interval touches
+        .with_columns(week_start=pl.datetime_ranges(
+            pl.col("Start").dt.truncate("1w"), pl.col("End").dt.truncate("1w"), interval="1w"
+        ))
+        .explode("week_start")
+        .with_columns(
+            Start=pl.max_horizontal("Start", "week_start"),
+            End=pl.min_horizontal("End", pl.col("week_start") + pl.duration(days=6))
+        )
+        .group_by(keys)
+        .agg(
+            pl.col("Effort").sum().alias("Effort%"),
+            pl.col("Projects").unique().sort().str.join(", ")
+        )
+        .sort(keys)
+        .collect()
+        .to_pandas()
+    )
+    for column in ['Name', 'Skill']:
+        weekly_sum[column] = weekly_sum[column].astype("category")
+    return weekly_sum
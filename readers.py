@@ -0,0 +1,120 @@
+import io
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.feather
+
+from pipeline import SOURCE_COLUMNS, check_columns
+
+
+# File types accepted by the uploader
+UPLOAD_TYPES = ["xlsx", "xls", "csv", "parquet", "arrow", "feather"]
+
+# Read as text rather than left to per-cell type inference
+TEXT_COLUMNS = ["ConsultantName", "ProjectName", "CoreSkill", "OtherSkills"]
+
+# The Rust-based calamine reader is much faster than openpyxl; without it
+# pandas falls back to its default engine for the file type
+EXCEL_ENGINE = "calamine" if find_spec("python_calamine") else None
+
+
+def is_excel(file_name):
+    return Path(file_name).suffix.lower() in (".xlsx", ".xls")
+
+
+def excel_sheets(data):
+    return pd.ExcelFile(io.BytesIO(data), engine=EXCEL_ENGINE).sheet_names
+
+
+def read_excel(data, sheet_name=0):
+    # Exports carry many unused columns, so only the pipeline's are read.
+    # Missing ones are reported by the pipeline's column check
+    return pd.read_excel(
+        io.BytesIO(data),
+        sheet_name=sheet_name,
+        usecols=lambda column: column in SOURCE_COLUMNS,
+        dtype=dict.fromkeys(TEXT_COLUMNS, str),
+        engine=EXCEL_ENGINE
+    )
+
+
+def read_csv(data):
+    # pyarrow parses CSV multi-threaded and infers dates on the way. Empty
+    # cells are read as missing and date-only columns (date32) as datetime64
+    # rather than datetime.date objects, so rows match the same rows read
+    # from the other formats
+    table = pyarrow.csv.read_csv(
+        pa.BufferReader(data),
+        convert_options=pyarrow.csv.ConvertOptions(strings_can_be_null=True)
+    )
+    return table.to_pandas(date_as_object=False)
+
+
+def read_parquet(data):
+    return pd.read_parquet(io.BytesIO(data))
+
+
+def read_arrow(data):
+    # Arrow IPC / Feather is read straight from the upload buffer
+    return pyarrow.feather.read_table(pa.BufferReader(data)).to_pandas()
+
+
+# File extension -> reader, and how it is described in the diagnostics
+READERS = {
+    ".xlsx": (read_excel, f"Excel ({EXCEL_ENGINE or 'openpyxl'})"),
+    ".xls": (read_excel, f"Excel ({EXCEL_ENGINE or 'xlrd'})"),
+    ".csv": (read_csv, "CSV (pyarrow)"),
+    ".parquet": (read_parquet, "Parquet (pyarrow)"),
+    ".arrow": (read_arrow, "Arrow IPC (pyarrow)"),
+    ".feather": (read_arrow, "Arrow IPC (pyarrow)")
+}
+
+
+def read_upload(file_name, data, sheet_name=None):
+    """Read an upload, or one sheet of it; returns the frame and how it was read."""
+    suffix = Path(file_name).suffix.lower()
+    if suffix not in READERS:
+        raise ValueError(f"Unsupported file type: {suffix or file_name}")
+    reader, description = READERS[suffix]
+
+    started = time.perf_counter()
+    dataset = reader(data) if sheet_name is None else reader(data, sheet_name)
+    elapsed = time.perf_counter() - started
+    return dataset, f"{description}, {elapsed:.2f} s, {len(dataset):,} rows"
+
+
+def read_uploads(uploads):
+    """Read (file name, data, sheet name) parts in parallel and stack them."""
+    started = time.perf_counter()
+    if len(uploads) == 1:
+        results = [read_upload(*uploads[0])]
+    else:
+        # Parsing is CPU bound, so the parts go to separate processes. They are
+        # spawned, as forking the threaded Streamlit server can deadlock
+        with ProcessPoolExecutor(
+            max_workers=min(len(uploads), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = list(pool.map(read_upload, *zip(*uploads)))
+
+    diagnostics = {}
+    seen = Counter()
+    for (file_name, _, sheet_name), (dataset, summary) in zip(uploads, results):
+        source = file_name if sheet_name is None else f"{file_name} [{sheet_name}]"
+        # Uploads may share a name, so repeats are numbered
+        seen[source] += 1
+        if seen[source] > 1:
+            source = f"{source} ({seen[source]})"
+        check_columns(dataset, source)
+        diagnostics[source] = summary
+    diagnostics["Total read time"] = f"{time.perf_counter() - started:.2f} s"
+
+    return pd.concat([dataset for dataset, _ in results], ignore_index=True), diagnostics
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pandas as pd
+
+from pipeline import INTERVAL_COLUMNS
+
+
+# Cleaned interval tables are saved here as <content hash>.parquet
+STORE_DIR = Path(".gantt_store")
+
+# Older datasets are deleted once the store holds more than this many
+STORE_MAX_DATASETS = 8
+
+
+def dataset_path(file_hash):
+    return STORE_DIR / f"{file_hash}.parquet"
+
+
+def save_intervals(file_hash, intervals):
+    path = dataset_path(file_hash)
+    if not path.exists():
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so a reader never sees half a file
+        partial = path.with_suffix(".partial")
+        intervals.to_parquet(partial, index=False)
+        partial.replace(path)
+    path.touch()
+
+    saved = sorted(STORE_DIR.glob("*.parquet"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in saved[STORE_MAX_DATASETS:]:
+        stale.unlink(missing_ok=True)
+
+
+def last_saved_hash():
+    saved = sorted(STORE_DIR.glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+    return saved[-1].stem if saved else None
+
+
+def load_intervals(file_hash, columns=INTERVAL_COLUMNS):
+    # Only the pipeline's columns are read from the file
+    return pd.read_parquet(dataset_path(file_hash), columns=columns)